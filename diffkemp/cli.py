@@ -140,6 +140,10 @@ def make_argument_parser():
                             help="loads frequently used modules to memory and \
                             uses them in SimpLL",
                             action="store_true")
+    compare_ap.add_argument("--enable-result-cache",
+                            help="persistently cache comparison results on \
+                            disk and reuse them in subsequent runs",
+                            action="store_true")
     compare_ap.add_argument("--full-diff",
                             help="show diff for all functions \
                             (even semantically equivalent ones)",
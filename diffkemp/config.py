@@ -123,6 +123,7 @@ class Config:
         verbosity=0,
         use_ffi=False,
         semdiff_tool=None,
+        result_cache=False,
     ):
         """
         Store configuration of DiffKemp
@@ -138,6 +139,7 @@ class Config:
         :param verbosity: Verbosity level (currently boolean).
         :param use_ffi: Use Python FFI to call SimpLL.
         :param semdiff_tool: Tool to use for semantic diff.
+        :param result_cache: Persistently cache comparison results on disk.
         """
 
         self.snapshot_first = snapshot_first
@@ -151,6 +153,7 @@ class Config:
         self.extended_stat = extended_stat
         self.verbosity = verbosity
         self.use_ffi = use_ffi
+        self.result_cache = result_cache
 
         # Semantic diff tool configuration
         self.semdiff_tool = semdiff_tool
@@ -202,4 +205,5 @@ class Config:
             verbosity=args.verbose,
             use_ffi=not args.disable_simpll_ffi,
             semdiff_tool=args.semdiff_tool,
+            result_cache=args.enable_result_cache,
         )
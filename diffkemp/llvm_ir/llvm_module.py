@@ -6,6 +6,7 @@ Functions for working with modules and parameters in them.
 from diffkemp.simpll.library import SimpLLModule
 from diffkemp.simpll._simpll.lib import shutdownSimpLL
 from diffkemp.utils import get_opt_command
+import hashlib
 import os
 import re
 import shutil
@@ -52,6 +53,9 @@ class LlvmModule:
         self.llvm_module = None
         self.unlinked_llvm = None
         self.linked_modules = set()
+        # Hash of the LLVM IR file and whether it declares external functions
+        # (with the file name and its mtime)
+        self._llvm_info = None
 
     def parse_module(self, force=False):
         """Parse module file into LLVM module using SimpLL"""
@@ -124,6 +128,34 @@ class LlvmModule:
         with open(self.llvm, "r") as llvm_file:
             return pattern.search(llvm_file.read()) is not None
 
+    def _get_llvm_info(self):
+        """
+        Get hash of the contents of the LLVM IR file and whether the file
+        contains declarations of external functions. Both are computed again
+        only if the file changes.
+        """
+        mtime = os.path.getmtime(self.llvm)
+        if self._llvm_info is None or \
+                self._llvm_info[:2] != (self.llvm, mtime):
+            with open(self.llvm, "rb") as llvm_file:
+                content = llvm_file.read()
+            digest = hashlib.blake2b(content, digest_size=16).digest()
+            external = re.search(rb"^declare[^@]*@(?!llvm\.)", content,
+                                 flags=re.MULTILINE) is not None
+            self._llvm_info = (self.llvm, mtime, digest, external)
+        return self._llvm_info
+
+    def has_external_functions(self):
+        """
+        Check if module contains declarations of functions (other than LLVM
+        intrinsics) whose definitions are elsewhere.
+        """
+        return self._get_llvm_info()[3]
+
+    def get_llvm_hash(self):
+        """Get hash of the contents of the LLVM IR file."""
+        return self._get_llvm_info()[2]
+
     def is_declaration(self, fun):
         """
         Check if the given function is a declaration (does not have body).
@@ -18,6 +18,8 @@ class SourceTree:
         self.source_dir = os.path.abspath(source_dir)
         self.source_finder = source_finder
         self.modules = dict()
+        # Cache of LLVM IR files containing definitions of symbols
+        self.symbol_sources = dict()
 
     def initialize(self):
         if self.source_finder is not None:
@@ -61,7 +63,12 @@ class SourceTree:
         if self.source_finder is None:
             raise SourceNotFoundException(symbol)
 
-        source = self.source_finder.find_llvm_with_symbol_def(symbol)
+        # The lookup may be expensive (it may even build the module), hence
+        # its results are cached for repeated queries of the same symbol.
+        if symbol not in self.symbol_sources:
+            self.symbol_sources[symbol] = \
+                self.source_finder.find_llvm_with_symbol_def(symbol)
+        source = self.symbol_sources[symbol]
         if source:
             source = self._make_abs_path(source)
         if source is None or not os.path.isfile(source):
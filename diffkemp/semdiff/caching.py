@@ -348,7 +348,10 @@ class ComparisonGraph:
         updated respectively.
         Note: the graph in the argument is expected to reference (in edges)
         only vertices that are already present in one graph or the other.
+        :return: List of vertices that were added to the graph or whose
+        cachable mark was reset.
         """
+        updated = []
         for name, vertex in graph.vertices.items():
             if (name not in self.vertices or
                     self[name].compare_vertex_priority(vertex)):
@@ -359,8 +362,11 @@ class ComparisonGraph:
                     # mark for all vertices affected by the previous result.
                     for vertex_to_reset in self[name].prevents_caching_of:
                         vertex_to_reset.cachable = True
+                        updated.append(vertex_to_reset)
                 # Note: the entry to equal_funs is added automatically.
                 self[name] = vertex
+                updated.append(vertex)
+        return updated
 
     def normalize(self):
         """
@@ -1,12 +1,28 @@
 """Semantic difference of two functions using llreve and Z3 SMT solver."""
 from diffkemp.llvm_ir.source_tree import SourceNotFoundException
 from diffkemp.simpll.simpll import run_simpll, SimpLLException
+from diffkemp.simpll.simpll_lib import lib_file as simpll_lib_file
 from diffkemp.semdiff.result import Result
-from diffkemp.syndiff.function_syntax_diff import syntax_diff
-from subprocess import Popen, PIPE
-from threading import Timer
+from diffkemp.syndiff.function_syntax_diff import syntax_diff_batch
+from diffkemp.utils import (result_cache_key, result_cache_load,
+                            result_cache_store)
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import Popen, DEVNULL, PIPE, TimeoutExpired
+from threading import Lock
+import os
 import sys
 
+# Mapping of Z3 outputs to results of the comparison
+_Z3_VERDICTS = {
+    b"sat": Result.Kind.NOT_EQUAL,
+    b"unsat": Result.Kind.EQUAL,
+    b"unknown": Result.Kind.UNKNOWN,
+}
+
+# Lock guarding the accesses to parsed LLVM modules from parallel semantic
+# comparisons
+_llvm_module_lock = Lock()
+
 
 def _kill(processes):
     """ Kill each process of the list. """
@@ -14,7 +30,7 @@ def _kill(processes):
         p.kill()
 
 
-def _link_symbol_def(snapshot, module, symbol):
+def _link_symbol_def(snapshot, module, symbol, linked_cache=None):
     """
     Try to find and link a missing symbol definition inside the given snapshot.
     Look inside the source directory if no definition is found inside the
@@ -23,8 +39,15 @@ def _link_symbol_def(snapshot, module, symbol):
     :param snapshot: Snapshot where the definition should be.
     :param module: Module which requires the  missing definition.
     :param symbol: Symbol with a missing definition to look for.
+    :param linked_cache: Set of (snapshot, symbol) pairs for which linking
+    has been already attempted. Such symbols are not searched for again.
     :return: True if the symbol has been successfully linked, False otherwise.
     """
+    if linked_cache is not None:
+        if (snapshot, symbol) in linked_cache:
+            return False
+        linked_cache.add((snapshot, symbol))
+
     new_mod = None
     result = False
     time = snapshot.created_time.timestamp() if snapshot.created_time else None
@@ -47,6 +70,103 @@ def _link_symbol_def(snapshot, module, symbol):
     return result
 
 
+def _result_cache_files(mod_first, mod_second, config):
+    """
+    Get the list of files whose contents affect the result of a comparison
+    of functions from the given modules (used for the persistent result
+    cache).
+    """
+    files = [mod_first.llvm, mod_second.llvm]
+    if config.custom_pattern_config:
+        files.append(config.custom_pattern_config.path)
+        files.extend(sorted(config.custom_pattern_config.pattern_files))
+    return files
+
+
+def _result_cache_key(mod_first, mod_second, fun_first, fun_second, glob_var,
+                      config):
+    """
+    Compute the key of the persistent result cache for the comparison of
+    the given functions. The key covers the contents of both LLVM modules
+    and of the custom pattern files, and all options that affect the result
+    of the comparison, including the build of SimpLL.
+    """
+    return result_cache_key(
+        _result_cache_files(mod_first, mod_second, config),
+        (mod_first.llvm, mod_second.llvm, fun_first, fun_second,
+         glob_var.name if glob_var else None,
+         sorted(config.builtin_patterns.settings.items()),
+         config.custom_pattern_config.path
+         if config.custom_pattern_config else None,
+         config.print_asm_diffs, config.full_diff, config.semdiff_tool,
+         config.timeout if config.semdiff_tool else None,
+         os.path.getmtime(simpll_lib_file)))
+
+
+def _result_cache_lookup(cache_key, files, prev_result_graph):
+    """
+    Look up the result of a comparison in the persistent result cache.
+    :param cache_key: Key of the comparison.
+    :param files: Files that the result depends on.
+    :param prev_result_graph: Graph from the previous comparison.
+    :return: Pair of the cached result and of the partial result graph of
+    the cached SimpLL run, or None if there is no usable entry.
+    """
+    cached = result_cache_load(cache_key, files)
+    if cached is None:
+        return None
+    result, result_graph, linked_files, linked_hash = cached
+    # Modules linked into the compared modules during the cached run must
+    # not have changed either.
+    try:
+        if result_cache_key(linked_files, None) != linked_hash:
+            return None
+    except OSError:
+        return None
+    # Functions skipped by SimpLL due to the SimpLL cache are unknown in the
+    # cached graph. Their results must be known from the previous comparison,
+    # otherwise the calls to them would be left dangling in the merged graph.
+    unknown = [name for name, vertex in result_graph.vertices.items()
+               if vertex.result == Result.Kind.UNKNOWN]
+    if unknown and (prev_result_graph is None or
+                    any(name not in prev_result_graph.vertices
+                        for name in unknown)):
+        return None
+    # Unknown results depend on the state of the SimpLL cache at the time of
+    # the cached run, hence they must not be merged.
+    for name in unknown:
+        del result_graph.vertices[name]
+    return result, result_graph
+
+
+def _absorb_result_graph(prev_result_graph, curr_result_graph,
+                         function_cache):
+    """
+    Merge the partial result graph of a comparison into the graph from
+    the previous comparison (if there is one) and add the newly received
+    results to the SimpLL cache.
+    :return: The merged graph.
+    """
+    if prev_result_graph:
+        # Note: "curr_result_graph" is here the partial result graph, i.e. can
+        # contain unknown results that are known in the graph from the
+        # previous comparison.
+        new_vertices = prev_result_graph.absorb_graph(curr_result_graph)
+        curr_result_graph = prev_result_graph
+    else:
+        new_vertices = curr_result_graph.vertices.values()
+
+    # Add the newly received results to the ignored functions file.
+    # Note: only vertices that have been inserted by this merge are added,
+    # the rest is already in the cache.
+    if function_cache:
+        function_cache.update(
+            [v for v in new_vertices
+             if v.result not in [Result.Kind.UNKNOWN,
+                                 Result.Kind.ASSUMED_EQUAL]])
+    return curr_result_graph
+
+
 def _run_llreve_z3(first, second, funFirst, funSecond, coupled, timeout,
                    verbosity):
     """
@@ -69,9 +189,7 @@ def _run_llreve_z3(first, second, funFirst, funSecond, coupled, timeout,
     :param verbosity: Verbosity level
     """
 
-    stderr = None
-    if verbosity == 0:
-        stderr = open('/dev/null', 'w')
+    stderr = DEVNULL if verbosity == 0 else None
 
     # Commands for running llreve and Z3 (output of llreve is piped into Z3)
     command = ["build/llreve/reve/reve/llreve",
@@ -79,8 +197,8 @@ def _run_llreve_z3(first, second, funFirst, funSecond, coupled, timeout,
                "--fun=" + funFirst + "," + funSecond,
                "-muz", "--ir-input", "--bitvect", "--infer-marks",
                "--disable-auto-coupling"]
-    for c in coupled:
-        command.append("--couple-functions={},{}".format(c[0], c[1]))
+    command.extend(f"--couple-functions={first_fun},{second_fun}"
+                   for first_fun, second_fun in coupled)
 
     if verbosity > 0:
         sys.stderr.write(" ".join(command) + "\n")
@@ -90,30 +208,26 @@ def _run_llreve_z3(first, second, funFirst, funSecond, coupled, timeout,
     z3_process = Popen(["z3", "fixedpoint.engine=duality", "-in"],
                        stdin=llreve_process.stdout,
                        stdout=PIPE, stderr=stderr)
+    # Allow llreve to receive SIGPIPE if Z3 exits before reading all input.
+    llreve_process.stdout.close()
 
-    # Set timeout for both tools
-    timer = Timer(timeout, _kill, [[llreve_process, z3_process]])
+    # Wait for the result with a timeout for both tools
     try:
-        timer.start()
-
-        z3_process.wait()
+        z3_output, _ = z3_process.communicate(timeout=timeout)
+    except TimeoutExpired:
+        _kill([llreve_process, z3_process])
+        z3_process.communicate()
+        llreve_process.wait()
+        return Result(Result.Kind.TIMEOUT, first, second)
+    llreve_process.wait()
+
+    result_kind = Result.Kind.ERROR
+    # Processing the output
+    for line in z3_output.splitlines():
+        result_kind = _Z3_VERDICTS.get(line.strip(), result_kind)
+
+    if z3_process.returncode != 0:
         result_kind = Result.Kind.ERROR
-        # Processing the output
-        for line in z3_process.stdout:
-            line = line.strip()
-            if line == b"sat":
-                result_kind = Result.Kind.NOT_EQUAL
-            elif line == b"unsat":
-                result_kind = Result.Kind.EQUAL
-            elif line == b"unknown":
-                result_kind = Result.Kind.UNKNOWN
-
-        if z3_process.returncode != 0:
-            result_kind = Result.Kind.ERROR
-    finally:
-        if not timer.is_alive():
-            result_kind = Result.Kind.TIMEOUT
-        timer.cancel()
 
     return Result(result_kind, first, second)
 
@@ -122,12 +236,9 @@ def functions_semdiff(first, second, fun_first, fun_second, config):
     """
     Compare two functions for semantic equality.
 
-    Functions are compared under various assumptions, each having some
-    'assumption level'. The higher the level is, the more strong assumption has
-    been made. Level 0 indicates no assumption. These levels are determined
-    from differences of coupled functions that are set as a parameter of the
-    analysis. The analysis tries all assumption levels in increasing manner
-    until functions are proven to be equal or no assumptions remain.
+    Functions are compared in a single run of the semantic diff tool. Functions
+    called from both compared functions are coupled, i.e. they are assumed to
+    be equal.
 
     :param first: File with the first LLVM module
     :param second: File with the second LLVM module
@@ -135,26 +246,62 @@ def functions_semdiff(first, second, fun_first, fun_second, config):
     :param fun_second: Function from the second module to be compared
     :param config: Configuration.
     """
-    if fun_first == fun_second:
-        fun_str = fun_first
-    else:
-        fun_str = fun_second
-    sys.stdout.write("      Semantic diff of {}".format(fun_str))
-    sys.stdout.write("...")
-    sys.stdout.flush()
+    if config.verbosity > 0:
+        if fun_first == fun_second:
+            fun_str = fun_first
+        else:
+            fun_str = fun_second
+        # Write the whole line at once so that messages of comparisons
+        # running in parallel do not interleave.
+        sys.stdout.write(f"      Semantic diff of {fun_str}...\n")
+        sys.stdout.flush()
 
     # Run the actual analysis
     if config.semdiff_tool == "llreve":
-        called_first = first.get_functions_called_by(fun_first)
-        called_second = second.get_functions_called_by(fun_second)
-        called_couplings = [(f, s) for f in called_first for s in called_second
-                            if f == s]
+        # Parsed LLVM modules are shared among concurrently running
+        # comparisons, only the external tools may run in parallel.
+        with _llvm_module_lock:
+            called_first = first.get_functions_called_by(fun_first)
+            called_second = second.get_functions_called_by(fun_second)
+        # Couple the functions called from both compared functions (sorted
+        # to keep the llreve command deterministic).
+        called_couplings = [(f, f) for f in
+                            sorted(set(called_first) & set(called_second))]
         result = _run_llreve_z3(first.llvm, second.llvm, fun_first, fun_second,
                                 called_couplings, config.timeout,
                                 config.verbosity)
+        return result
+
+
+def _run_semdiffs(objects_to_compare, first, second, config):
+    """
+    Compare the non-equal functions for semantic equality using the semantic
+    diff tool set in the configuration. The comparisons are independent, so
+    they are run in parallel. Threads are sufficient for this as the work is
+    done by external processes.
+    :param objects_to_compare: List of differing objects (as returned by
+    ComparisonGraph.graph_to_fun_pair_list).
+    :param first: Simplified first LLVM module
+    :param second: Simplified second LLVM module
+    :param config: Configuration
+    :return: List containing the result of the semantic comparison for each
+    object in objects_to_compare or None if the object is not compared.
+    """
+    if config.semdiff_tool is None:
+        return [None] * len(objects_to_compare)
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [executor.submit(functions_semdiff, first, second,
+                                   fun_pair[0].name, fun_pair[1].name,
+                                   config)
+                   if not fun_pair[0].diff_kind == "function" else None
+                   for fun_pair in objects_to_compare]
+        results = [future.result() if future else None for future in futures]
+
+    if any(result is not None for result in results):
         first.clean_module()
         second.clean_module()
-        return result
+    return results
 
 
 def functions_diff(mod_first, mod_second,
@@ -188,7 +335,29 @@ def functions_diff(mod_first, mod_second,
     """
     result = Result(Result.Kind.NONE, fun_first, fun_second)
     curr_result_graph = None
+    # Partial result graph produced by the last SimpLL run (stored into the
+    # persistent result cache).
+    simpll_result_graph = None
+    cache_key = None
     try:
+        # The cache is not used when simplified IR or extended statistics are
+        # requested since those need the SimpLL run.
+        if (config.result_cache and not config.output_llvm_ir and
+                not config.extended_stat):
+            cache_key = _result_cache_key(mod_first, mod_second,
+                                          fun_first, fun_second,
+                                          glob_var, config)
+            cached = _result_cache_lookup(
+                cache_key,
+                _result_cache_files(mod_first, mod_second, config),
+                prev_result_graph)
+            if cached is not None:
+                result, simpll_result_graph = cached
+                result.graph = _absorb_result_graph(prev_result_graph,
+                                                    simpll_result_graph,
+                                                    function_cache)
+                return result
+
         if config.verbosity > 0:
             if fun_first == fun_second:
                 fun_str = fun_first
@@ -197,6 +366,19 @@ def functions_diff(mod_first, mod_second,
             print("Semantic diff of {} (in {})".format(fun_str,
                                                        mod_first.llvm))
 
+        if (fun_first == fun_second and glob_var is None and
+                not config.output_llvm_ir and not config.extended_stat and
+                mod_first.get_llvm_hash() == mod_second.get_llvm_hash() and
+                not mod_first.has_external_functions()):
+            # The modules are identical and there are no missing definitions
+            # that could be linked into them, hence the function is equal.
+            result.kind = Result.Kind.EQUAL
+            result.graph = prev_result_graph
+            return result
+
+        # Symbols whose definitions have been already searched for (each
+        # symbol is searched for at most once, regardless of the result).
+        linked_cache = set()
         simplify = True
         while simplify:
             simplify = False
@@ -208,6 +390,7 @@ def functions_diff(mod_first, mod_second,
                 first_simpl = ""
                 second_simpl = ""
                 curr_result_graph = prev_result_graph
+                simpll_result_graph = None
             else:
                 # Simplify modules and get the output graph.
                 first_simpl, second_simpl, curr_result_graph, missing_defs = \
@@ -220,6 +403,7 @@ def functions_diff(mod_first, mod_second,
                                if function_cache else None,
                                module_cache=module_cache,
                                modules_to_cache=modules_to_cache)
+                simpll_result_graph = curr_result_graph
                 if missing_defs:
                     # If there are missing function definitions, try to find
                     # their implementation, link them to the current modules,
@@ -228,36 +412,28 @@ def functions_diff(mod_first, mod_second,
                         if "first" in fun_pair:
                             if _link_symbol_def(config.snapshot_first,
                                                 mod_first,
-                                                fun_pair["first"]):
+                                                fun_pair["first"],
+                                                linked_cache):
                                 simplify = True
 
                         if "second" in fun_pair:
                             if _link_symbol_def(config.snapshot_second,
                                                 mod_second,
-                                                fun_pair["second"]):
+                                                fun_pair["second"],
+                                                linked_cache):
                                 simplify = True
-                if prev_result_graph and not simplify:
-                    # Note: "curr_result_graph" is here the partial result
-                    # graph, i.e. can contain unknown results that are known in
-                    # the graph from the previous comparison.
-                    prev_result_graph.absorb_graph(curr_result_graph)
-                    curr_result_graph = prev_result_graph
-
-                    # Add the newly received results to the ignored functions
-                    # file.
-                    # Note: there won't be any duplicates, since all functions
-                    # that were in the cache before will be marked as unknown.
-                    if function_cache:
-                        function_cache.update(
-                            [v for v in curr_result_graph.vertices.values()
-                             if v.result not in [Result.Kind.UNKNOWN,
-                                                 Result.Kind.ASSUMED_EQUAL]])
+                if not simplify:
+                    curr_result_graph = _absorb_result_graph(
+                        prev_result_graph, curr_result_graph, function_cache)
 
         objects_to_compare, syndiff_bodies_left, syndiff_bodies_right = \
             curr_result_graph.graph_to_fun_pair_list(fun_first,
                                                      fun_second,
                                                      config.full_diff)
 
+        # Modules linked for missing definitions (the result depends on them)
+        linked_files = sorted(m.llvm for m in mod_first.linked_modules |
+                              mod_second.linked_modules)
         mod_first.restore_unlinked_llvm()
         mod_second.restore_unlinked_llvm()
 
@@ -266,15 +442,18 @@ def functions_diff(mod_first, mod_second,
         else:
             # If the functions are not syntactically equal, objects_to_compare
             # contains a list of functions and macros that are different.
-            for fun_pair in objects_to_compare:
-                if (not fun_pair[0].diff_kind == "function" and
-                        config.semdiff_tool is not None):
-                    # If a semantic diff tool is set, use it for further
-                    # comparison of non-equal functions
-                    fun_result = functions_semdiff(first_simpl, second_simpl,
-                                                   fun_pair[0].name,
-                                                   fun_pair[1].name,
-                                                   config)
+            # If a semantic diff tool is set, use it for further comparison of
+            # non-equal functions.
+            semdiff_results = _run_semdiffs(objects_to_compare, first_simpl,
+                                            second_simpl, config)
+            fun_results = []
+            # Functions and types whose syntactic diffs should be obtained,
+            # grouped by the pairs of source files they are in
+            syntax_diff_groups = {}
+            for fun_pair, semdiff_result in zip(objects_to_compare,
+                                                semdiff_results):
+                if semdiff_result is not None:
+                    fun_result = semdiff_result
                 else:
                     fun_result = Result(fun_pair[2], fun_first, fun_second)
                 fun_result.first = fun_pair[0]
@@ -282,14 +461,10 @@ def functions_diff(mod_first, mod_second,
                 if fun_result.kind == Result.Kind.NOT_EQUAL or \
                    config.full_diff:
                     if fun_result.first.diff_kind in ["function", "type"]:
-                        # Get the syntactic diff of functions or types
-                        fun_result.diff = syntax_diff(
-                            fun_result.first.filename,
-                            fun_result.second.filename,
-                            fun_result.first.name,
-                            fun_result.first.diff_kind,
-                            fun_pair[0].line,
-                            fun_pair[1].line)
+                        files = (fun_result.first.filename,
+                                 fun_result.second.filename)
+                        syntax_diff_groups.setdefault(files, []).append(
+                            fun_result)
                     elif fun_result.first.diff_kind == "syntactic":
                         # Find the syntax differences and append the left and
                         # right value to create the resulting diff
@@ -301,12 +476,34 @@ def functions_diff(mod_first, mod_second,
                             "warning: unknown diff kind: {}\n".format(
                                 fun_result.first.diff_kind))
                         fun_result.diff = "unknown\n"
+                fun_results.append(fun_result)
+
+            # Get the syntactic diffs of functions or types (running the diff
+            # utility once for each pair of source files)
+            for files, group in syntax_diff_groups.items():
+                diffs = syntax_diff_batch(
+                    files[0], files[1],
+                    [(r.first.diff_kind, r.first.line, r.second.line)
+                     for r in group])
+                for fun_result, diff in zip(group, diffs):
+                    fun_result.diff = diff
+
+            for fun_result in fun_results:
                 # Do not save the result if there is neither syntactic nor
                 # semantic difference.
                 if (fun_result.kind != Result.Kind.NOT_EQUAL and
                         fun_result.diff == ""):
                     continue
                 result.add_inner(fun_result)
+
+        # Timeouts and errors of the semantic diff tool may be caused by
+        # the machine load, hence such results are not cached.
+        if (cache_key and simpll_result_graph and
+                all(r.kind not in [Result.Kind.TIMEOUT, Result.Kind.ERROR]
+                    for r in [result, *result.inner.values()])):
+            result_cache_store(cache_key,
+                               (result, simpll_result_graph, linked_files,
+                                result_cache_key(linked_files, None)))
     except ValueError:
         result.kind = Result.Kind.ERROR
     except SimpLLException as e:
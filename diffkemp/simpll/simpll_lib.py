@@ -13,3 +13,5 @@ except ImportError:
 
 lib = _simpll.lib
 ffi = _simpll.ffi
+# Path to the loaded SimpLL C extension module
+lib_file = _simpll.__file__
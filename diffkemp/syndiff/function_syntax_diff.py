@@ -10,6 +10,7 @@ from diffkemp.utils import get_end_line, EndLineNotFound
 import os
 from enum import IntEnum
 import re
+import shutil
 
 DIFF_NOT_OBTAINED_MESSAGE = "  [could not obtain diff]\n"
 UNIFIED_HUNK_HEAD_REGEX = re.compile(r"""^@@\ -(\d+) # from file start
@@ -22,17 +23,73 @@ UNIFIED_HUNK_HEAD_REGEX = re.compile(r"""^@@\ -(\d+) # from file start
 
 def syntax_diff(first_file, second_file, name, kind, first_line, second_line):
     """Get diff of a C function or type between first_file and second_file"""
-    try:
-        first_end = get_end_line(first_file, first_line, kind)
-        second_end = get_end_line(second_file, second_line, kind)
-        diff, first_file_fragment, _ = \
-            make_diff(diff_format=DiffFormat.CONTEXT,
-                      first_file=first_file, second_file=second_file,
-                      first_start=first_line, second_start=second_line,
-                      first_end=first_end, second_end=second_end)
-    except (UnicodeDecodeError, EndLineNotFound):
-        return DIFF_NOT_OBTAINED_MESSAGE
+    return syntax_diff_batch(first_file, second_file,
+                             [(kind, first_line, second_line)])[0]
+
 
+def syntax_diff_batch(first_file, second_file, objects):
+    """
+    Get diffs of multiple C functions or types between first_file and
+    second_file. The diff utility is run only once for all of them.
+    :param first_file: First source file.
+    :param second_file: Second source file.
+    :param objects: List of tuples (kind, first_line, second_line) describing
+                    the functions or types to get the diffs of.
+    :return: List containing the diff of each object.
+    """
+    tmpdir = mkdtemp()
+    try:
+        first_dir = os.path.join(tmpdir, "1")
+        second_dir = os.path.join(tmpdir, "2")
+        os.mkdir(first_dir)
+        os.mkdir(second_dir)
+
+        # Extract each object into a pair of files named by its index
+        diffs = [DIFF_NOT_OBTAINED_MESSAGE] * len(objects)
+        for index, (kind, first_line, second_line) in enumerate(objects):
+            first_fragment = os.path.join(first_dir, str(index))
+            second_fragment = os.path.join(second_dir, str(index))
+            try:
+                first_end = get_end_line(first_file, first_line, kind)
+                second_end = get_end_line(second_file, second_line, kind)
+                extract_code(first_file, first_line, first_end, first_fragment)
+                extract_code(second_file, second_line, second_end,
+                             second_fragment)
+                diffs[index] = ""
+            except (UnicodeDecodeError, EndLineNotFound):
+                for fragment in [first_fragment, second_fragment]:
+                    if os.path.exists(fragment):
+                        os.remove(fragment)
+
+        # Compare the directories with the fragments and split the output into
+        # diffs of the individual fragments
+        file_head_regex = re.compile(
+            r"^diff .* {}/(\d+) ".format(re.escape(first_dir)))
+        fragment_diffs = {}
+        index = None
+        for line in _run_diff(["diff", "-r", "-C", "1", first_dir,
+                               second_dir]).splitlines(keepends=True):
+            match = file_head_regex.match(line)
+            if match:
+                index = int(match.group(1))
+                fragment_diffs[index] = []
+            elif index is not None:
+                fragment_diffs[index].append(line)
+
+        for index, diff_lines in fragment_diffs.items():
+            diffs[index] = _fix_context_diff(
+                "".join(diff_lines), objects[index][1], objects[index][2],
+                os.path.join(first_dir, str(index)))
+        return diffs
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def _fix_context_diff(diff, first_line, second_line, first_file_fragment):
+    """
+    Fix a diff of two fragments in the context format, so that it has
+    the line numbers of the original files and a function header.
+    """
     if diff.isspace() or diff == "":
         # Empty diff
         return diff
@@ -102,17 +159,21 @@ def make_diff(diff_format, first_file, second_file, first_start, second_start,
     extract_code(first_file, first_start, first_end, first_file_fragment)
     extract_code(second_file, second_start, second_end, second_file_fragment)
 
+    diff = _run_diff(command)
+    return diff, first_file_fragment, second_file_fragment
+
+
+def _run_diff(command):
+    """Run the diff utility and return its output."""
     # check_output fails when the two files are different due to the error code
     # (1), which in fact signalizes success; the exception has to be caught and
     # the error code evaluated manually
     try:
-        diff = check_output(command).decode('utf-8')
+        return check_output(command).decode('utf-8')
     except CalledProcessError as e:
         if e.returncode == 1:
-            diff = e.output.decode('utf-8')
-        else:
-            raise
-    return diff, first_file_fragment, second_file_fragment
+            return e.output.decode('utf-8')
+        raise
 
 
 def extract_code(file, start, end, output_file_path):
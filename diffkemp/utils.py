@@ -1,15 +1,39 @@
+from bisect import bisect_right
+from functools import lru_cache
+import hashlib
 import os
+import pickle
 import subprocess
 import re
 import sys
 
 LLVM_FUNCTION_REGEX = re.compile(r"^define.*@(\w+)\(", flags=re.MULTILINE)
-
-
+# Tokens of C source code relevant for finding the end of a definition.
+# Comments and literals are matched so that braces inside them are skipped.
+DEFINITION_TOKEN_REGEX = re.compile(rb"""
+      //[^\n]*                         # line comment
+    | /\*.*?\*/                        # block comment
+    | "(?:\\.|[^"\\\n])*"              # string literal
+    | '(?:\\.|[^'\\\n])*'              # character literal
+    | (?P<macro_end>^\);[^\S\n]*$)     # end of a definition made by a macro
+    | (?P<brace>[{}])                  # brace
+    | ^[^\S\n]*\#[^\S\n]*              # preprocessor conditional
+      (?P<directive>if|elif|else|endif)
+    """, flags=re.VERBOSE | re.MULTILINE | re.DOTALL)
+# Lines terminating a definition of a function / type (used if the end of
+# the definition cannot be found by tracking the depth of braces)
+TERMINATOR_REGEX = {
+    "function": re.compile(rb"^(?:\}|\);)[^\S\n]*$", flags=re.MULTILINE),
+    "type": re.compile(rb"^\};[^\S\n]*$", flags=re.MULTILINE),
+}
+
+
+@lru_cache(maxsize=None)
 def get_simpll_build_dir():
     """
     Return the current SimpLL build directory as specified
     in the `SIMPLL_BUILD_DIR` environment variable.
+    The value is determined once per process.
     """
     build_dir_var = "SIMPLL_BUILD_DIR"
     if build_dir_var in os.environ:
@@ -17,9 +41,70 @@ def get_simpll_build_dir():
     return "build"
 
 
+def get_result_cache_dir():
+    """
+    Return the directory where comparison results are persistently cached.
+    """
+    return os.path.join(get_simpll_build_dir(), "semdiff_cache")
+
+
+def result_cache_key(files, args):
+    """
+    Compute a key for the persistent result cache from the contents of the
+    given files and from the representation of the given arguments.
+    """
+    key_hash = hashlib.blake2b()
+    for filename in files:
+        with open(filename, "rb") as file:
+            key_hash.update(file.read())
+    key_hash.update(repr(args).encode())
+    return key_hash.hexdigest()
+
+
+def result_cache_load(key, files):
+    """
+    Load a value from the persistent result cache.
+    Returns None if there is no entry for the key or if any of the files
+    has been modified after the entry was stored.
+    """
+    cache_file = os.path.join(get_result_cache_dir(), f"{key}.pkl")
+    try:
+        cache_mtime = os.path.getmtime(cache_file)
+        if any(os.path.getmtime(f) > cache_mtime for f in files):
+            return None
+        with open(cache_file, "rb") as file:
+            return pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+            ImportError, IndexError, KeyError, TypeError, ValueError):
+        # Unreadable, partially written, or incompatible entry
+        return None
+
+
+def result_cache_store(key, value):
+    """
+    Store a value into the persistent result cache.
+    The entry is written into a temporary file first so that concurrent runs
+    never read a partially written entry.
+    """
+    cache_dir = get_result_cache_dir()
+    cache_file = os.path.join(cache_dir, f"{key}.pkl")
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_file, "wb") as file:
+            pickle.dump(value, file)
+        os.replace(tmp_file, cache_file)
+    except (OSError, pickle.PicklingError, RecursionError):
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+@lru_cache(maxsize=None)
 def get_llvm_version():
     """
     Return the current LLVM major version number.
+    The version is determined once per process, since running `llvm-config`
+    for each constructed opt command is expensive.
     """
     return int(subprocess.check_output(
         ["llvm-config", "--version"]).decode().rstrip().split(".")[0])
@@ -33,12 +118,11 @@ def get_opt_command(passes, llvm_file, overwrite=True):
     opt_command = ["opt", llvm_file]
     if get_llvm_version() >= 16:
         # The new PM expects passes as "-passes=function(pass1),module(pass2)"
-        passes_formatted = map(lambda p: f"{p[1]}({p[0]})", passes)
-        opt_command.append("-passes=" + ",".join(passes_formatted))
+        opt_command.append("-passes=" + ",".join(
+            f"{unit}({name})" for name, unit in passes))
     else:
         # The legacy PM expects passes as "-pass1 -pass2"
-        pass_names = map(lambda p: p[0], passes)
-        opt_command.extend(map(lambda pass_name: f"-{pass_name}", pass_names))
+        opt_command.extend(f"-{name}" for name, _ in passes)
     if overwrite:
         opt_command.extend(["-S", "-o", llvm_file])
     return opt_command
@@ -51,30 +135,74 @@ class EndLineNotFound(Exception):
     pass
 
 
+@lru_cache(maxsize=64)
+def _read_source_file(filename, mtime):
+    """
+    Read contents of a source file as bytes together with the list of offsets
+    at which the individual lines start. The results are cached since the same
+    file is typically read for many definitions it contains.
+    The modification time is a part of the cache key so that changed files
+    are read again.
+    """
+    with open(filename, "rb") as file:
+        data = file.read()
+    line_starts = [0]
+    line_starts.extend(match.end() for match in re.finditer(rb"\n", data))
+    return data, line_starts
+
+
 def get_end_line(filename, start, kind):
     """
     Get number of line where function / type ends.
+    The end is the line containing the brace that closes the body of the
+    definition, which may start on a later line than the given one (e.g. for
+    functions with multi-line signatures). For functions defined by a macro
+    call, the end is a line containing nothing but ");".
+    Only the first branch of each preprocessor conditional is considered, so
+    that braces repeated in alternative branches are not counted twice.
+    If the end cannot be found this way, it is detected as the first line that
+    contains nothing but the terminator of the definition.
     Can raise UnicodeDecodeError, EndLineError.
     """
-
-    if kind == "function":
-        terminator_list = ["}", ");"]
-    elif kind == "type":
-        terminator_list = ["};"]
-
-    with open(filename, "r", encoding='utf-8') as file:
-        lines = file.readlines()
-
-        # The end of the function is detected as a line that contains
-        # nothing but an ending curly bracket
-        line_number = start
-        line = lines[line_number - 1]
-        while line.rstrip() not in terminator_list:
-            line_number += 1
-            if line_number > len(lines):
-                raise EndLineNotFound
-            line = lines[line_number - 1]
-        return line_number
+    data, line_starts = _read_source_file(filename,
+                                          os.path.getmtime(filename))
+    if start > len(line_starts):
+        raise EndLineNotFound
+    offset = line_starts[start - 1]
+
+    depth = 0
+    # Nesting level of preprocessor conditionals (relative to the start line)
+    cond_depth = 0
+    # Nesting level of the conditional whose inactive branch is being skipped
+    skipped_cond = None
+    for match in DEFINITION_TOKEN_REGEX.finditer(data, offset):
+        if match.lastgroup == "directive":
+            directive = match.group("directive")
+            if directive == b"if":
+                cond_depth += 1
+            elif directive == b"endif":
+                if skipped_cond == cond_depth:
+                    skipped_cond = None
+                cond_depth = max(cond_depth - 1, 0)
+            elif skipped_cond is None:
+                # "#elif" or "#else" starts an alternative branch
+                skipped_cond = cond_depth
+        elif skipped_cond is not None:
+            continue
+        elif match.lastgroup == "brace":
+            depth += 1 if match.group() == b"{" else -1
+            if depth <= 0:
+                break
+        elif (match.lastgroup == "macro_end" and kind == "function" and
+                depth == 0):
+            break
+    else:
+        match = TERMINATOR_REGEX[kind].search(data, offset)
+        if match is None:
+            raise EndLineNotFound
+    # Check that the definition is a valid UTF-8 text
+    data[offset:match.end()].decode("utf-8")
+    return bisect_right(line_starts, match.start())
 
 
 def get_functions_from_llvm(llvm_files):
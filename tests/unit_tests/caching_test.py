@@ -119,10 +119,12 @@ def test_absort_graph(graph):
                            ComparisonGraph.Edge("missing", "app/w.c", 6))
         new_graph.add_edge(new_graph["strength"], side,
                            ComparisonGraph.Edge("main_function", "app/w.c", 7))
-    graph.absorb_graph(new_graph)
+    updated = graph.absorb_graph(new_graph)
     assert graph["missing"].result == Result.Kind.NOT_EQUAL
     assert graph["do_check"].result == Result.Kind.NOT_EQUAL
     assert graph["strength"].result == Result.Kind.NOT_EQUAL
+    # Only the replacing vertices are reported as updated.
+    assert updated == [graph["missing"], graph["strength"]]
 
 
 def test_normalize(graph):
@@ -263,8 +265,9 @@ def test_cachability_reset_after_absorb(graph_uncachable):
     graph_to_merge["f3"] = ComparisonGraph.Vertex(
         dup("f3"), Result.Kind.NOT_EQUAL, dup("app/f2.c"), dup(20)
     )
-    graph_uncachable.absorb_graph(graph_to_merge)
+    updated = graph_uncachable.absorb_graph(graph_to_merge)
     assert graph_uncachable["f2"].cachable
+    assert graph_uncachable["f2"] in updated
 
 
 @pytest.fixture
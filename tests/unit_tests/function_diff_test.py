@@ -0,0 +1,148 @@
+"""Unit tests for the comparison of functions."""
+
+from diffkemp.config import Config
+from diffkemp.llvm_ir.llvm_module import LlvmModule
+from diffkemp.semdiff.caching import ComparisonGraph
+from diffkemp.semdiff.function_diff import functions_diff, \
+    _result_cache_lookup
+from diffkemp.semdiff.result import Result
+from diffkemp.utils import result_cache_key
+from conftest import dup
+import pytest
+
+
+@pytest.fixture
+def cached_graph():
+    """
+    Partial result graph of a cached SimpLL run in which the comparison of
+    "do_check" was skipped due to the SimpLL cache.
+    """
+    g = ComparisonGraph()
+    g["main_function"] = ComparisonGraph.Vertex(
+        dup("main_function"), Result.Kind.EQUAL, dup("app/main.c"), dup(51)
+    )
+    g["do_check"] = ComparisonGraph.Vertex(
+        dup("do_check"), Result.Kind.UNKNOWN
+    )
+    for side in ComparisonGraph.Side:
+        g.add_edge(g["main_function"], side,
+                   ComparisonGraph.Edge("do_check", "app/main.c", 58))
+    return g
+
+
+@pytest.fixture
+def modules(tmp_path):
+    """Pair of different LLVM modules defining the function "f"."""
+    first = tmp_path / "first.ll"
+    second = tmp_path / "second.ll"
+    first.write_text("define i32 @f() {\n  ret i32 0\n}\n")
+    second.write_text("define i32 @f() {\n  ret i32 1\n}\n")
+    return LlvmModule(str(first)), LlvmModule(str(second))
+
+
+def test_result_cache_lookup(mocker, graph, cached_graph):
+    """
+    Test that unknown vertices of a cached graph are dropped when their
+    results are known in the graph of the previous comparison.
+    """
+    result = Result(Result.Kind.EQUAL, "main_function", "main_function")
+    mocker.patch("diffkemp.semdiff.function_diff.result_cache_load",
+                 return_value=(result, cached_graph, [],
+                               result_cache_key([], None)))
+    cached = _result_cache_lookup("key", [], graph)
+    assert cached is not None
+    assert cached[0] is result
+    assert "main_function" in cached[1].vertices
+    assert "do_check" not in cached[1].vertices
+
+
+@pytest.mark.parametrize("prev_graph", [None, ComparisonGraph()])
+def test_result_cache_lookup_unknown(mocker, cached_graph, prev_graph):
+    """
+    Test that a cached result is not used if the graph of the previous
+    comparison does not contain the functions that are unknown in the cached
+    graph.
+    """
+    result = Result(Result.Kind.EQUAL, "main_function", "main_function")
+    mocker.patch("diffkemp.semdiff.function_diff.result_cache_load",
+                 return_value=(result, cached_graph, [],
+                               result_cache_key([], None)))
+    assert _result_cache_lookup("key", [], prev_graph) is None
+
+
+def test_result_cache_lookup_linked(mocker, graph, tmp_path):
+    """
+    Test that a cached result is not used if a module that was linked into
+    the compared modules during the cached run has changed.
+    """
+    linked = tmp_path / "linked.ll"
+    linked.write_text("define i32 @f() {\n  ret i32 0\n}\n")
+    result = Result(Result.Kind.EQUAL, "main_function", "main_function")
+    mocker.patch("diffkemp.semdiff.function_diff.result_cache_load",
+                 return_value=(result, ComparisonGraph(), [str(linked)],
+                               result_cache_key([str(linked)], None)))
+    assert _result_cache_lookup("key", [], graph) is not None
+    linked.write_text("define i32 @f() {\n  ret i32 1\n}\n")
+    assert _result_cache_lookup("key", [], graph) is None
+    linked.unlink()
+    assert _result_cache_lookup("key", [], graph) is None
+
+
+@pytest.mark.parametrize("kind,stored", [
+    (Result.Kind.NOT_EQUAL, True),
+    (Result.Kind.TIMEOUT, False),
+    (Result.Kind.ERROR, False),
+])
+def test_functions_diff_result_cache_store(mocker, modules, kind, stored):
+    """
+    Test that results of the semantic diff tool are persistently cached
+    unless the tool has timed out or failed.
+    """
+    simpll_graph = mocker.MagicMock()
+    simpll_graph.graph_to_fun_pair_list.return_value = (
+        [(Result.Entity("f", diff_kind="syntactic"),
+          Result.Entity("f", diff_kind="syntactic"), Result.Kind.NOT_EQUAL)],
+        {"f": "0"}, {"f": "1"})
+    mocker.patch("diffkemp.semdiff.function_diff.run_simpll",
+                 return_value=("", "", simpll_graph, []))
+    mocker.patch("diffkemp.semdiff.function_diff._run_semdiffs",
+                 return_value=[Result(kind, "f", "f")])
+    mocker.patch("diffkemp.semdiff.function_diff.result_cache_load",
+                 return_value=None)
+    store = mocker.patch("diffkemp.semdiff.function_diff.result_cache_store")
+    config = Config(result_cache=True)
+    # Set the tool directly, the configuration requires llreve to be built.
+    config.semdiff_tool = "llreve"
+    config.timeout = 10
+    result = functions_diff(mod_first=modules[0], mod_second=modules[1],
+                            fun_first="f", fun_second="f", glob_var=None,
+                            config=config)
+    assert result.kind == kind
+    assert store.called == stored
+
+
+@pytest.mark.parametrize("declarations,simplified", [
+    ("", False),
+    ("declare i32 @g()\n", True),
+])
+def test_functions_diff_identical(mocker, tmp_path, declarations,
+                                  simplified):
+    """
+    Test that a function from identical modules is reported equal without
+    running SimpLL unless the modules declare functions whose definitions
+    could be linked into them.
+    """
+    first = tmp_path / "first.ll"
+    second = tmp_path / "second.ll"
+    for llvm in [first, second]:
+        llvm.write_text(declarations + "define i32 @f() {\n  ret i32 0\n}\n")
+    simpll_graph = mocker.MagicMock()
+    simpll_graph.graph_to_fun_pair_list.return_value = ([], {}, {})
+    run_simpll = mocker.patch("diffkemp.semdiff.function_diff.run_simpll",
+                              return_value=("", "", simpll_graph, []))
+    result = functions_diff(mod_first=LlvmModule(str(first)),
+                            mod_second=LlvmModule(str(second)),
+                            fun_first="f", fun_second="f", glob_var=None,
+                            config=Config())
+    assert result.kind == Result.Kind.EQUAL
+    assert run_simpll.called == simplified
@@ -6,6 +6,8 @@ from diffkemp.config import Config, BuiltinPatterns
 from diffkemp.llvm_ir.source_tree import SourceTree
 from diffkemp.llvm_ir.kernel_llvm_source_builder import KernelLlvmSourceBuilder
 from diffkemp.semdiff.module_diff import functions_diff
+from diffkemp.syndiff.function_syntax_diff import syntax_diff_batch, \
+    DIFF_NOT_OBTAINED_MESSAGE
 
 
 def test_syntax_diff():
@@ -28,3 +30,32 @@ def test_syntax_diff():
                                 fun_first=f, fun_second=f, glob_var=None,
                                 config=config)
     assert fun_result.inner[f].diff == diff
+
+
+def test_syntax_diff_batch(tmp_path):
+    """
+    Test getting diffs of multiple functions and types at once, including
+    a type whose end cannot be found.
+    """
+    first = tmp_path / "first.c"
+    second = tmp_path / "second.c"
+    first.write_text("int f(void)\n{\n    return 1;\n}\n\n"
+                     "struct s {\n    int a;\n};\n\n"
+                     "int g(void)\n{\n    return 0;\n}\n\n"
+                     "struct t {\n    int b;\n")
+    second.write_text("\nint f(void)\n{\n    return 2;\n}\n\n"
+                      "struct s {\n    long a;\n};\n\n"
+                      "int g(void)\n{\n    return 0;\n}\n\n"
+                      "struct t {\n    int b;\n")
+    objects = [("function", 1, 2), ("type", 15, 16), ("type", 6, 7),
+               ("function", 10, 11)]
+    diffs = syntax_diff_batch(str(first), str(second), objects)
+    assert diffs == [
+        ("*************** int f(void)\n*** 2,4 ***\n  {\n!     return 1;\n"
+         "  }\n--- 3,5 ---\n  {\n!     return 2;\n  }\n"),
+        DIFF_NOT_OBTAINED_MESSAGE,
+        ("*************** struct s {\n*** 6,8 ***\n  struct s {\n"
+         "!     int a;\n  };\n--- 7,9 ---\n  struct s {\n!     long a;\n"
+         "  };\n"),
+        ""
+    ]
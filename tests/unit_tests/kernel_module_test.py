@@ -45,6 +45,41 @@ def test_is_declaration(mod):
         assert mod.is_declaration(f)
 
 
+def test_has_external_functions(mod):
+    """Test checking if module declares functions defined elsewhere."""
+    assert mod.has_external_functions()
+
+
+def test_has_external_functions_update(tmp_path):
+    """
+    Test that the check for declarations of external functions is updated
+    when the module file changes.
+    """
+    llvm = tmp_path / "mod.ll"
+    llvm.write_text("declare i8* @llvm.stacksave()\n")
+    module = LlvmModule(str(llvm))
+    assert not module.has_external_functions()
+
+    llvm.write_text("declare i32 @printk(i8*, ...)\n")
+    stat = os.stat(llvm)
+    os.utime(llvm, times=(stat.st_atime, stat.st_mtime + 1))
+    assert module.has_external_functions()
+
+
+def test_get_llvm_hash(mod):
+    """Test that the hash of a module is updated when its file changes."""
+    tmp = tempfile.mkdtemp()
+    copy = LlvmModule(shutil.copy(mod.llvm, tmp))
+    assert copy.get_llvm_hash() == mod.get_llvm_hash()
+
+    with open(copy.llvm, "a") as llvm_file:
+        llvm_file.write("\n")
+    stat = os.stat(copy.llvm)
+    os.utime(copy.llvm, times=(stat.st_atime, stat.st_mtime + 1))
+    assert copy.get_llvm_hash() != mod.get_llvm_hash()
+    shutil.rmtree(tmp)
+
+
 def test_link_modules(source, mod):
     """
     Test linking modules.
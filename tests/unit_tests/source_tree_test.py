@@ -34,6 +34,17 @@ def test_get_module_for_symbol(source):
     assert mod.has_function("__alloc_workqueue_key")
 
 
+def test_get_module_for_symbol_cached(source, mocker):
+    """
+    Test that the LLVM module with a symbol definition is looked up only once
+    for repeated queries of the same symbol.
+    """
+    find_def = mocker.spy(source.source_finder, "find_llvm_with_symbol_def")
+    mod = source.get_module_for_symbol("__alloc_workqueue_key")
+    assert source.get_module_for_symbol("__alloc_workqueue_key") is mod
+    find_def.assert_called_once_with("__alloc_workqueue_key")
+
+
 def test_get_module_for_symbol_built_after(source):
     """
     Test getting LLVM module with a function definition when the module was
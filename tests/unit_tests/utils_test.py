@@ -0,0 +1,145 @@
+"""Unit tests for the helper functions in utils.py."""
+
+from diffkemp.utils import get_end_line, EndLineNotFound, \
+    result_cache_key, result_cache_load, result_cache_store
+import os
+import pytest
+
+SOURCE = """static int
+foo(int a,
+    int b)
+{
+    if (a) {
+        printk("{ %d\\n", b); /* } */
+    }
+    // }
+    return '}';
+}
+
+typedef struct {
+    struct { int x; } in;
+} t_t;
+
+DEFINE_BAR(bar,
+    int, c
+);
+"""
+
+SOURCE_PREPROCESSOR = """#ifdef CONFIG_X
+static int baz(int a) {
+#else
+static int baz(void) {
+#endif
+#if defined(A)
+    if (a) {
+#elif defined(B)
+    if (!a) {
+#else
+    if (a > 1) {
+#endif
+        return 1;
+    }
+    return 0;
+}
+"""
+
+
+@pytest.fixture
+def source_file(tmp_path):
+    file = tmp_path / "source.c"
+    file.write_text(SOURCE)
+    yield str(file)
+
+
+def test_get_end_line_function(source_file):
+    """
+    Test finding the end of a function with a multi-line signature, nested
+    blocks, and braces inside comments and literals.
+    """
+    assert get_end_line(source_file, 1, "function") == 10
+
+
+def test_get_end_line_type(source_file):
+    """Test finding the end of a type containing a nested type."""
+    assert get_end_line(source_file, 12, "type") == 14
+
+
+def test_get_end_line_macro(source_file):
+    """Test finding the end of a function defined by a macro call."""
+    assert get_end_line(source_file, 16, "function") == 18
+
+
+def test_get_end_line_not_found(source_file):
+    """Test that an error is raised if the end of definition is not found."""
+    with pytest.raises(EndLineNotFound):
+        get_end_line(source_file, 16, "type")
+    with pytest.raises(EndLineNotFound):
+        get_end_line(source_file, 100, "function")
+
+
+def test_get_end_line_preprocessor(tmp_path):
+    """
+    Test finding the end of a function whose signature and opening braces
+    are repeated in alternative branches of preprocessor conditionals.
+    """
+    file = tmp_path / "preprocessor.c"
+    file.write_text(SOURCE_PREPROCESSOR)
+    assert get_end_line(str(file), 2, "function") == 16
+    assert get_end_line(str(file), 4, "function") == 16
+
+
+@pytest.fixture
+def result_cache(tmp_path, mocker):
+    """Redirect the persistent result cache into a temporary directory."""
+    cache_dir = tmp_path / "semdiff_cache"
+    mocker.patch("diffkemp.utils.get_result_cache_dir",
+                 return_value=str(cache_dir))
+    module = tmp_path / "module.ll"
+    module.write_text("define void @f() {\n  ret void\n}\n")
+    yield str(cache_dir), str(module)
+
+
+def test_result_cache_key(result_cache):
+    """Test that the cache key depends on the file contents and arguments."""
+    _, module = result_cache
+    key = result_cache_key([module], ("f", "f"))
+    assert key == result_cache_key([module], ("f", "f"))
+    assert key != result_cache_key([module], ("f", "g"))
+    with open(module, "a") as file:
+        file.write("\n")
+    assert key != result_cache_key([module], ("f", "f"))
+
+
+def test_result_cache_round_trip(result_cache):
+    """Test storing a value into the cache and loading it back."""
+    cache_dir, module = result_cache
+    key = result_cache_key([module], ("f", "f"))
+    assert result_cache_load(key, [module]) is None
+    result_cache_store(key, {"result": [1, 2]})
+    assert result_cache_load(key, [module]) == {"result": [1, 2]}
+    # No temporary files are left behind.
+    assert os.listdir(cache_dir) == [f"{key}.pkl"]
+
+
+def test_result_cache_invalidated(result_cache):
+    """Test that entries older than the files they depend on are ignored."""
+    cache_dir, module = result_cache
+    key = result_cache_key([module], ("f", "f"))
+    result_cache_store(key, "value")
+    cache_mtime = os.path.getmtime(os.path.join(cache_dir, f"{key}.pkl"))
+    os.utime(module, times=(cache_mtime + 1, cache_mtime + 1))
+    assert result_cache_load(key, [module]) is None
+
+
+def test_result_cache_corrupted(result_cache):
+    """Test that a corrupted or partially written entry is ignored."""
+    cache_dir, module = result_cache
+    key = result_cache_key([module], ("f", "f"))
+    result_cache_store(key, "value")
+    cache_file = os.path.join(cache_dir, f"{key}.pkl")
+    with open(cache_file, "wb") as file:
+        file.write(b"garbage")
+    assert result_cache_load(key, [module]) is None
+    with open(cache_file, "wb") as file:
+        file.write(b"")
+    assert result_cache_load(key, [module]) is None